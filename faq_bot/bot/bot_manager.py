@@ -1,13 +1,103 @@
 #!/usr/bin/env python3
 """ Module that handles the bot's logic features """
-import smtplib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 import logging
+import threading
+import pybktree
+import pygtrie
+from rapidfuzz.distance import Levenshtein
 from .nlp_manager import NLPManager
+from .smtp_pool import smtp_pool
 
 # Configure the logger
 logging.basicConfig(level=logging.INFO)
 
+# Stored questions shorter than this never answer longer inputs by prefix,
+# otherwise a question like "what" would capture every input starting with it
+PREFIX_MIN_WORDS = 3
+# Maximum edit distance for a typo to still match a stored question
+FUZZY_MAX_DISTANCE = 2
+# Allow one edit per this many characters, so short inputs must match exactly
+FUZZY_CHARS_PER_EDIT = 5
+
+# Maximum number of pending (forwarded, unanswered) questions kept, least recently used are evicted first
+PENDING_MAX_ENTRIES = 10_000
+
+# Background workers that email forwarded queries, so respond() doesn't wait on SMTP
+_FORWARD_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="forward-query")
+# Maximum number of forwards queued or being sent, the executor's own queue is unbounded
+FORWARD_MAX_BACKLOG = 1000
+_FORWARD_SLOTS = threading.BoundedSemaphore(FORWARD_MAX_BACKLOG)
+# Recorded for a query whose forward failed, it is forwarded again when asked again
+_FORWARD_ERROR = "Error forwarding to admin. Please try again."
+
+# Prebuilt wire format of the query email, so plain ASCII queries skip the email.mime machinery
+_QUERY_EMAIL_TEMPLATE = (
+    "From: {sender}\r\n"
+    "To: {recipient}\r\n"
+    "Subject: New Query: {subject}\r\n"
+    "MIME-Version: 1.0\r\n"
+    "Content-Type: text/plain; charset=\"us-ascii\"\r\n"
+    "Content-Transfer-Encoding: 7bit\r\n"
+    "\r\n"
+    "The bot received a new query:\r\n\r\n{body}\r\n\r\nPlease respond to the user.\r\n"
+)
+# Keep the Subject header and body lines well under the 998 character line limit of RFC 5322
+_MAX_TEMPLATE_LINE = 900
+_MAX_SUBJECT = _MAX_TEMPLATE_LINE - len("Subject: New Query: ")
+
+
+def normalize(text):
+    """
+    Normalizes a question for database lookups.
+
+    Parameters:
+    - text (str): The question or user input.
+
+    Returns:
+    - str: The lowercased text with runs of whitespace collapsed to single spaces.
+    """
+    return " ".join(text.lower().split())
+
+
+def build_query_email(q, sender_email, recipient_email):
+    """
+    Builds the email that forwards a query to the admin.
+
+    Parameters:
+    - q (str): The question to forward to the admin.
+    - sender_email (str): Bot's email address.
+    - recipient_email (str): Admin's email address.
+
+    Returns:
+    - bytes or str: The full message, headers included, ready for sendmail.
+    """
+    # Newlines would break out of the Subject header, so collapse all whitespace there
+    subject = " ".join(q.split())
+    # A single long word can't be folded, cut it so the header line stays within the limit
+    if len(subject) > _MAX_SUBJECT:
+        subject = subject[:_MAX_SUBJECT - 3] + "..."
+    body_lines = q.splitlines()
+    if ((q + sender_email + recipient_email).isascii()
+            and all(len(line) <= _MAX_TEMPLATE_LINE for line in body_lines)):
+        return _QUERY_EMAIL_TEMPLATE.format(
+            sender=sender_email,
+            recipient=recipient_email,
+            subject=subject,
+            body="\r\n".join(body_lines),
+        ).encode("ascii")
+
+    # Non-ASCII queries need header encoding, and non-ASCII or very long lines a
+    # base64 body since 7bit lines can't exceed the limit
+    msg = MIMEText(f"The bot received a new query:\n\n{q}\n\nPlease respond to the user.", "plain", "utf-8")
+    msg["Subject"] = "New Query: " + subject
+    msg["From"] = sender_email
+    msg["To"] = recipient_email
+    # as_string() doesn't fold headers by default, fold the encoded Subject into short lines
+    return msg.as_string(maxheaderlen=78)
+
 
 class RuleBasedBot:
     """
@@ -16,19 +106,135 @@ class RuleBasedBot:
     """
     def __init__(self):
         """ Initialize the database to store the data """
+        # Questions answered by the admin, never evicted
         self.db = {}
+        # Bounded LRU of forwarded questions awaiting an answer, every miss lands
+        # here so it must not grow forever
+        self.pending = OrderedDict()
+        # Word-level trie of answered questions for longest-prefix lookups
+        self.db_index = pygtrie.StringTrie(separator=" ")
+        # BK-tree over the same questions for near-miss (typo) lookups
+        self.db_fuzzy = pybktree.BKTree(Levenshtein.distance)
+        # Django serves requests concurrently, guard the database and its indexes
+        self._db_lock = threading.RLock()
         self.nlp_manager = NLPManager()
 
     def add_to_db(self, q, a):
-        """ Adds the new query to the database """
-        self.db[q] = a
+        """
+        Adds the answered query to the database under its normalized form.
+        The question is also added to the prefix and fuzzy indexes so longer
+        or misspelled inputs get the same answer.
+        """
+        key = normalize(q)
+        with self._db_lock:
+            self.db[key] = a
+            self.pending.pop(key, None)
+            if key:
+                if key not in self.db_index:
+                    self.db_fuzzy.add(key)
+                self.db_index[key] = a
+
+    def add_pending(self, q, a):
+        """
+        Records a forwarded query awaiting the admin's answer, evicting the least
+        recently used pending queries once there are more than PENDING_MAX_ENTRIES.
+        Pending queries only match exactly, they are not indexed.
+        """
+        key = normalize(q)
+        with self._db_lock:
+            self.pending[key] = a
+            self.pending.move_to_end(key)
+            while len(self.pending) > PENDING_MAX_ENTRIES:
+                self.pending.popitem(last=False)
+
+    def lookup_exact(self, lowered):
+        """
+        Finds the answer stored for exactly this input, marking pending queries as recently used.
+
+        Parameters:
+        - lowered (str): The normalized user input.
+
+        Returns:
+        - str or None: The stored answer or None if the input isn't in the database.
+        """
+        with self._db_lock:
+            answer = self.db.get(lowered)
+            if answer is None:
+                answer = self.pending.get(lowered)
+                if answer is not None:
+                    self.pending.move_to_end(lowered)
+            return answer
+
+    def lookup_prefix(self, lowered):
+        """
+        Finds the answer of the longest stored question that the input starts with.
+        Only questions of at least PREFIX_MIN_WORDS words can match this way.
+
+        Parameters:
+        - lowered (str): The normalized user input.
+
+        Returns:
+        - str or None: The stored answer or None if no question matches.
+        """
+        with self._db_lock:
+            step = self.db_index.longest_prefix(lowered)
+            if step and len(step.key.split()) >= PREFIX_MIN_WORDS:
+                return step.value
+            return None
+
+    def lookup_fuzzy(self, lowered):
+        """
+        Finds the answer of the closest stored question within a small edit distance.
+
+        Parameters:
+        - lowered (str): The normalized user input.
+
+        Returns:
+        - str or None: The stored answer or None if no question is close enough.
+        """
+        max_distance = min(FUZZY_MAX_DISTANCE, len(lowered) // FUZZY_CHARS_PER_EDIT)
+        if not max_distance:
+            return None
+        with self._db_lock:
+            # Closest first
+            for _, question in self.db_fuzzy.find(lowered, max_distance):
+                if self._is_typo_of(lowered, question):
+                    return self.db_index[question]
+        return None
+
+    def _is_typo_of(self, lowered, question):
+        """
+        Checks that the input only differs from a stored question by misspelled words.
+        A differing word that is an analyzer keyword, like "mission" versus "vision",
+        changes the meaning rather than being a typo.
+
+        Parameters:
+        - lowered (str): The normalized user input.
+        - question (str): The normalized stored question.
+
+        Returns:
+        - bool: True if the input reads as a misspelling of the question.
+        """
+        words = lowered.split()
+        question_words = question.split()
+        if len(words) != len(question_words):
+            return False
+        return all(
+            word == question_word
+            or not (self.nlp_manager.has_keyword(word) or self.nlp_manager.has_keyword(question_word))
+            for word, question_word in zip(words, question_words)
+        )
 
     def respond(self, user_input, admin_instance, smtp_server, smtp_port, sender_email, sender_password, recipient_email):
         """
-        Checks if an answer is provided in the db and responds.
-        If the response isn't found, it tries to answer using NLPManager.
+        Checks if an answer is provided in the db for exactly this input and responds.
+        If the response isn't found, it tries to answer using NLPManager, then
+        with the longest stored question the input starts with and, as a last
+        resort, with the closest stored question within a small edit distance.
         If not successful, it adds the query to the database,
-        then forwards it to the admin and marks it as unresolved.
+        then forwards it to the admin in the background and marks it as unresolved.
+        Once FORWARD_MAX_BACKLOG forwards are outstanding, the query is marked as
+        an error forwarding to admin instead, and forwarded when asked again.
 
         Parameters:
         - user_input (str): The user's input.
@@ -42,27 +248,43 @@ class RuleBasedBot:
         Returns:
         - str: The bot's response.
         """
+        # Normalize once and share it between the database lookups and NLPManager
+        lowered = normalize(user_input)
+
         # Check if the user input is in the database
-        if user_input in self.db:
-            return self.db[user_input]
-        else:
-            # Try to answer using NLPManager
-            nlp_doc = self.nlp_manager.process_input(user_input)
-            greeting_response = self.nlp_manager.analyze_greeting(nlp_doc)
-            mission_vision_response = self.nlp_manager.analyze_mission_vision(nlp_doc)
-            scia_values_response = self.nlp_manager.analyze_scia_values(nlp_doc)
-
-            if greeting_response:
-                return greeting_response
-            elif mission_vision_response:
-                return mission_vision_response
-            elif scia_values_response:
-                return scia_values_response
-            else:
-                # If not successful, add the query to the database and forward to admin
-                self.add_to_db(user_input, "Forwarded to admin's email. Waiting for response.")
-                admin_instance.forward_query_to_admin(user_input, smtp_server, smtp_port, sender_email, sender_password, recipient_email)
-                return "I don't have an answer for that, sorry."
+        exact_response = self.lookup_exact(lowered)
+        if exact_response is not None:
+            return exact_response
+
+        # Try to answer using NLPManager
+        nlp_response = self.nlp_manager.analyze(lowered)
+        if nlp_response:
+            return nlp_response
+
+        prefix_response = self.lookup_prefix(lowered)
+        if prefix_response:
+            return prefix_response
+        fuzzy_response = self.lookup_fuzzy(lowered)
+        if fuzzy_response:
+            return fuzzy_response
+
+        # If not successful, add the query to the database and forward to admin,
+        # unless the SMTP backlog is full (server down or slow), then drop the forward
+        if not _FORWARD_SLOTS.acquire(blocking=False):
+            admin_instance.log.error(f"Forward backlog full, not forwarding query '{user_input}'")
+            admin_instance.track_query(user_input, _FORWARD_ERROR)
+            return "I don't have an answer for that, sorry."
+        self.add_pending(lowered, "Forwarded to admin's email. Waiting for response.")
+        try:
+            future = _FORWARD_EXECUTOR.submit(
+                admin_instance.forward_query_to_admin,
+                user_input, smtp_server, smtp_port, sender_email, sender_password, recipient_email
+            )
+        except Exception:
+            _FORWARD_SLOTS.release()
+            raise
+        future.add_done_callback(lambda _: _FORWARD_SLOTS.release())
+        return "I don't have an answer for that, sorry."
 
 
 class Admin:
@@ -80,9 +302,27 @@ class Admin:
         - log : Initialize logger
         """
         self.bot = bot
-        self.unanswered_queries = {}
+        # Bounded LRU keyed by normalized question, every forwarded miss lands here too
+        self.unanswered_queries = OrderedDict()
+        self._queries_lock = threading.Lock()
         self.log = logging.getLogger(__name__)
 
+    def track_query(self, q, status):
+        """
+        Record the status or answer of a query under its normalized form, evicting the
+        least recently used queries once there are more than PENDING_MAX_ENTRIES.
+
+        Parameters:
+        - q (str): The question.
+        - status (str): The admin's answer or the forwarding status of the question.
+        """
+        key = normalize(q)
+        with self._queries_lock:
+            self.unanswered_queries[key] = status
+            self.unanswered_queries.move_to_end(key)
+            while len(self.unanswered_queries) > PENDING_MAX_ENTRIES:
+                self.unanswered_queries.popitem(last=False)
+
     def provide_answer(self, q, a):
         """
         Provide an answer to a question, add it to the bot's database, and track it as an unanswered query.
@@ -92,7 +332,7 @@ class Admin:
         - a (str): The admin's response to the question.
         """
         self.bot.add_to_db(q, a)
-        self.unanswered_queries[q] = a
+        self.track_query(q, a)
 
     def has_unanswered_queries(self):
         """
@@ -113,7 +353,8 @@ class Admin:
         Returns:
         - str: The admin's response or a default message if the question is not in the unanswered queries.
         """
-        return self.unanswered_queries.get(q, "I don't have an answer for that, sorry.")
+        with self._queries_lock:
+            return self.unanswered_queries.get(normalize(q), "I don't have an answer for that, sorry.")
 
     def get_unanswered_queries(self):
         """
@@ -122,7 +363,8 @@ class Admin:
         Returns:
         - list: A list of unanswered queries (questions without responses).
         """
-        return list(self.unanswered_queries.keys())
+        with self._queries_lock:
+            return list(self.unanswered_queries.keys())
 
     def mark_resolved(self, q):
         """
@@ -131,8 +373,8 @@ class Admin:
         Parameters:
         - q (str): The question to mark as resolved.
         """
-        if q in self.unanswered_queries:
-            del self.unanswered_queries[q]
+        with self._queries_lock:
+            self.unanswered_queries.pop(normalize(q), None)
 
     def forward_query_to_admin(self, q, smtp_server, smtp_port, sender_email, sender_password, recipient_email):
         """
@@ -147,31 +389,22 @@ class Admin:
         - recipient_email (str): Admin's email address.
         """
         try:
-            if q not in self.unanswered_queries:
-                # Create MIMEText object
-                msg = MIMEText(f"The bot received a new query:\n\n{q}\n\nPlease respond to the user.")
-                msg["Subject"] = "New Query: " + q
-                msg["From"] = sender_email
-                msg["To"] = recipient_email
-
-                # Establish a connection to the SMTP server
-                with smtplib.SMTP(smtp_server, smtp_port) as server:
-                    # Start TLS for security
-                    server.starttls()
-
-                    # Log in to the email server
-                    server.login(sender_email, sender_password)
+            # Skip queries already forwarded or answered, but retry the ones that failed
+            with self._queries_lock:
+                status = self.unanswered_queries.get(normalize(q), _FORWARD_ERROR)
+            if status == _FORWARD_ERROR:
+                msg = build_query_email(q, sender_email, recipient_email)
 
-                    # Send the email
-                    server.sendmail(sender_email, [recipient_email], msg.as_string())
+                # Send the email over the shared, already authenticated connection
+                smtp_pool.sendmail(smtp_server, smtp_port, sender_email, sender_password, [recipient_email], msg)
 
-                    # Log successful email forwarding
-                    self.log.info(f"Query forwarded successfully: {q}")
+                # Log successful email forwarding
+                self.log.info(f"Query forwarded successfully: {q}")
 
-                    # Add the query to unanswered_queries only if forwarding is successful
-                    self.unanswered_queries[q] = "Forwarded to admin's email. Waiting for response."
+                # Add the query to unanswered_queries only if forwarding is successful
+                self.track_query(q, "Forwarded to admin's email. Waiting for response.")
 
         except Exception as e:
             # Log the exception and mark the query as unresolved
             self.log.error(f"Error forwarding query '{q}': {e}")
-            self.unanswered_queries[q] = "Error forwarding to admin. Please try again."
+            self.track_query(q, _FORWARD_ERROR)
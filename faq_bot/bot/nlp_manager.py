@@ -1,28 +1,158 @@
 #!/usr/bin/env python3
-import spacy
+import functools
+import os
+import re
+
+# Texts per batch when running several inputs through spaCy with nlp.pipe
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", "32"))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_nlp():
+    """
+    Loads the spaCy language model once per process.
+    Only the tokenizer and NER are used, so the other pipeline
+    components are disabled.
+
+    spaCy takes seconds to import and the keyword analyzers don't need
+    it, so the model package is only imported on first use.
+
+    Returns:
+        spacy.Language: The spaCy language model for English text processing.
+    """
+    import en_core_web_sm
+
+    return en_core_web_sm.load(
+        disable=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"],
+    )
+
+
+def _keyword_pattern(keywords, whole_words=False):
+    """
+    Builds a regex alternation matching any of the keywords.
+
+    Args:
+        keywords (Iterable[str]): The lowercase keywords to match.
+        whole_words (bool): Whether keywords must match on word boundaries.
+
+    Returns:
+        str: The uncompiled pattern, without capturing groups.
+    """
+    # Longest first so multiword keywords win over their prefixes
+    alternation = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    if whole_words:
+        return rf"\b(?:{alternation})\b"
+    return f"(?:{alternation})"
+
+
+def _keyword_re(keywords, whole_words=False):
+    """
+    Compiles a single alternation matching any of the keywords.
+
+    Args:
+        keywords (Iterable[str]): The lowercase keywords to match.
+        whole_words (bool): Whether keywords must match on word boundaries.
+
+    Returns:
+        re.Pattern: The compiled pattern, with the matched keyword in group 1.
+    """
+    return re.compile(f"({_keyword_pattern(keywords, whole_words)})")
+
+
+_GREETINGS = frozenset({"hi", "hello", "hey"})
+_GRATITUDE_WORDS = frozenset({"thanks", "thank", "thank you"})
+_MISSION_KEYWORDS = frozenset({"mission"})
+_VISION_KEYWORDS = frozenset({"vision"})
+# A tuple rather than a set, the values are listed back to the user in this order
+_SCIA_KEYWORDS = ("safety", "customer obsession", "integrity", "accountability")
+_SCIA_VALUES = ", ".join(keyword.capitalize() for keyword in _SCIA_KEYWORDS)
+_GREETING_RESPONSE = "Hello there! How can I assist you today?"
+_GRATITUDE_RESPONSE = "You're welcome!"
+_MISSION_RESPONSE = "To propel Africa's prosperity by connecting its people, cultures and markets."
+_VISION_RESPONSE = "To be Africa's preferred and sustainable Aviation group."
+_SCIA_SCENARIOS = {
+    "safety":" Safety is the foundation of everything we do.",
+    "customer obsession":" We commit to creating positive memorable experiences for our customers.",
+    "integrity":" We shall be ethical and trustworthy in all our engagements and we shall treat each person with respect.",
+    "accountability":" We take initiative and responsibility for our actions, decisions and results."
+}
+
+_GREET_RE = _keyword_re(_GREETINGS, whole_words=True)
+_THANKS_RE = _keyword_re(_GRATITUDE_WORDS, whole_words=True)
+_MISSION_RE = _keyword_re(_MISSION_KEYWORDS)
+_VISION_RE = _keyword_re(_VISION_KEYWORDS)
+# "values" shares the SCIA pattern so the text is scanned once
+_SCIA_RE = _keyword_re(_SCIA_KEYWORDS + ("values",))
+
+# Every analyzer's keywords in one alternation of named groups, listed from the
+# highest priority route to the lowest, so analyze() routes with a single scan
+_ROUTES = (
+    ("greeting", _keyword_pattern(_GREETINGS, whole_words=True)),
+    ("gratitude", _keyword_pattern(_GRATITUDE_WORDS, whole_words=True)),
+    ("mission", _keyword_pattern(_MISSION_KEYWORDS)),
+    ("vision", _keyword_pattern(_VISION_KEYWORDS)),
+    ("values", _keyword_pattern({"values"})),
+    ("scia", _keyword_pattern(_SCIA_KEYWORDS)),
+)
+_ROUTE_PRIORITY = {route: rank for rank, (route, _) in enumerate(_ROUTES)}
+_ROUTER_RE = re.compile("|".join(f"(?P<{route}>{pattern})" for route, pattern in _ROUTES))
+
+
+def _route_rank(match):
+    """
+    Ranks a router match the way the chained analyzers prioritize it, lower wins.
+
+    Args:
+        match (re.Match): A match of _ROUTER_RE.
+
+    Returns:
+        tuple: The route's priority and a tie-breaker within the route.
+    """
+    route = match.lastgroup
+    if route == "greeting" and match.start():
+        # Only a greeting as the first word beats thanks, later ones rank just after it
+        return (_ROUTE_PRIORITY["gratitude"], 1)
+    if route == "scia":
+        # Several values mentioned, the one listed first in _SCIA_KEYWORDS wins
+        return (_ROUTE_PRIORITY["scia"], _SCIA_KEYWORDS.index(match.group()))
+    return (_ROUTE_PRIORITY[route], 0)
+
 
 class NLPManager:
     """
-    NLPManager class for natural language processing tasks using spaCy.
+    NLPManager class for natural language processing tasks.
+
+    The analyzers only look for a handful of fixed keywords, so they run
+    precompiled regular expressions over the lowercased input instead of a
+    full spaCy pipeline. spaCy is only loaded when entities are requested.
 
     Attributes:
-        nlp (spacy.Language): The spaCy language model loaded for English text processing.
+        nlp (spacy.Language): The spaCy language model, loaded on first use.
 
     Methods:
         process_input(user_input):
-            Processes the user input using the spaCy language model.
+            Normalizes the user input for the keyword analyzers.
+
+        analyze(user_input):
+            Runs all analyzers on the user input, memoizing the response per normalized input.
 
-        extract_entities(doc):
-            Extracts entities from the spaCy processed document.
+        has_keyword(text):
+            Checks whether the text mentions any keyword one of the analyzers responds to.
 
-        analyze_greeting(doc):
-            Analyzes the input document for common greetings and responds accordingly.
+        extract_entities(text):
+            Extracts entities from the text using the spaCy language model.
 
-        analyze_mission_vision(doc):
-            Analyzes the input document for keywords related to mission or vision and provides corresponding information.
+        extract_entities_batch(texts):
+            Extracts entities from several texts in batches using the spaCy language model.
 
-        analyze_scia_values(doc):
-            Analyzes the input document for keywords related to SCIA values and provides relevant scenarios.
+        analyze_greeting(text):
+            Analyzes the input text for common greetings and responds accordingly.
+
+        analyze_mission_vision(text):
+            Analyzes the input text for keywords related to mission or vision and provides corresponding information.
+
+        analyze_scia_values(text):
+            Analyzes the input text for keywords related to SCIA values and provides relevant scenarios.
 
         get_scenario_for_value(value):
             Retrieves a scenario description for a given SCIA value.
@@ -31,99 +161,184 @@ class NLPManager:
 
     def __init__(self):
         """
-        Initializes the NLPManager with the spaCy language model for English text processing.
+        Initializes the NLPManager and its response cache.
+        """
+        # FAQ traffic is highly repetitive, so remember the response per normalized input
+        self._analyze_cached = functools.lru_cache(maxsize=4096)(self._analyze)
+
+    @property
+    def nlp(self):
+        """
+        Returns the shared spaCy language model, loading it the first time it is needed.
+
+        Returns:
+            spacy.Language: The spaCy language model for English text processing.
         """
-        self.nlp = spacy.load("en_core_web_sm")
+        return _get_nlp()
 
     def process_input(self, user_input):
         """
-        Processes the user input using the spaCy language model.
+        Normalizes the user input for the keyword analyzers.
 
         Args:
             user_input (str): The input text to be processed.
 
         Returns:
-            spacy.Doc: The processed spaCy document.
+            str: The stripped, lowercased input text.
+        """
+        return user_input.strip().lower()
+
+    def analyze(self, user_input):
+        """
+        Runs the greeting, mission/vision and SCIA values analyzers on the user input.
+        Responses are memoized per normalized input.
+
+        Args:
+            user_input (str): The user's input.
+
+        Returns:
+            str or None: The first analyzer response or None if no analyzer matched.
         """
-        doc = self.nlp(user_input)
-        return doc
+        return self._analyze_cached(self.process_input(user_input))
+
+    def _analyze(self, text):
+        """
+        Runs all analyzers on normalized text in a single scan. Wrapped in an LRU cache by __init__.
+        Gives the same answers as calling analyze_greeting, analyze_mission_vision
+        and analyze_scia_values in turn.
+
+        Args:
+            text (str): The normalized input text.
+
+        Returns:
+            str or None: The first analyzer response or None if no analyzer matched.
+        """
+        best = None
+        best_rank = None
+        for match in _ROUTER_RE.finditer(text):
+            rank = _route_rank(match)
+            if best is None or rank < best_rank:
+                best, best_rank = match, rank
+                if rank == (0, 0):
+                    break
+        if best is None:
+            return None
+
+        route = best.lastgroup
+        if route == "greeting":
+            return _GREETING_RESPONSE
+        elif route == "gratitude":
+            return _GRATITUDE_RESPONSE
+        elif route == "mission":
+            return _MISSION_RESPONSE
+        elif route == "vision":
+            return _VISION_RESPONSE
+        elif route == "values":
+            return _SCIA_VALUES
+        keyword = best.group()
+        return f"{keyword.capitalize()}: {self.get_scenario_for_value(keyword)}"
 
-    def extract_entities(self, doc):
+    def has_keyword(self, text):
         """
-        Extracts entities from the spaCy processed document.
+        Checks whether the text mentions any keyword one of the analyzers responds to.
 
         Args:
-            doc (spacy.Doc): The processed spaCy document.
+            text (str): The normalized input text.
+
+        Returns:
+            bool: True if an analyzer keyword is present, False otherwise.
+        """
+        return _ROUTER_RE.search(text) is not None
+
+    def extract_entities(self, text):
+        """
+        Extracts entities from the text using the spaCy language model.
+
+        Args:
+            text (str): The input text.
 
         Returns:
             list: A list of extracted entity texts.
         """
+        doc = self.nlp(text)
         entities = [ent.text for ent in doc.ents]
         return entities
 
-    def analyze_greeting(self, doc):
+    def extract_entities_batch(self, texts):
+        """
+        Extracts entities from several texts, streaming them through spaCy in
+        batches of SPACY_BATCH_SIZE instead of one pipeline call per text.
+
+        Args:
+            texts (list): The input texts.
+
+        Returns:
+            list: A list of extracted entity texts for each input text.
+        """
+        return [
+            [ent.text for ent in doc.ents]
+            for doc in self.nlp.pipe(texts, batch_size=SPACY_BATCH_SIZE)
+        ]
+
+    def analyze_greeting(self, text):
         """
-        Analyzes the input document for common greetings and responds accordingly.
+        Analyzes the input text for common greetings and responds accordingly.
 
         Args:
-            doc (spacy.Doc): The processed spaCy document.
+            text (str): The lowercased input text.
 
         Returns:
             str or None: A greeting response or None if no greeting is detected.
         """
-        greetings = ["hi", "hello", "hey"]
-        gratitude_words = ["thanks", "thank", "thank you"]
-        for token in doc:
-            if token.text.lower() in greetings:
-                return "Hello there! How can I assist you today?"
-            if any(token.text.lower() in gratitude_words for token in doc):
-                return "You're welcome!"
-    
+        # A greeting as the first word wins, otherwise thanks anywhere beats a later greeting
+        if _GREET_RE.match(text):
+            return _GREETING_RESPONSE
+        if _THANKS_RE.search(text):
+            return _GRATITUDE_RESPONSE
+        if _GREET_RE.search(text):
+            return _GREETING_RESPONSE
         return None
 
-    def analyze_mission_vision(self, doc):
+    def analyze_mission_vision(self, text):
         """
-        Analyzes the input document for keywords related to mission or vision and provides corresponding information.
+        Analyzes the input text for keywords related to mission or vision and provides corresponding information.
 
         Args:
-            doc (spacy.Doc): The processed spaCy document.
+            text (str): The lowercased input text.
 
         Returns:
             str or None: Information about the mission or vision or None if no relevant keywords are found.
         """
-        mission_keywords = ["mission"]
-        vision_keywords = ["vision"]
-
-        if any(keyword in doc.text.lower() for keyword in mission_keywords):
-            return "To propel Africa's prosperity by connecting its people, cultures and markets."
-        elif any(keyword in doc.text.lower() for keyword in vision_keywords):
-            return "To be Africa's preferred and sustainable Aviation group."
+        if _MISSION_RE.search(text):
+            return _MISSION_RESPONSE
+        elif _VISION_RE.search(text):
+            return _VISION_RESPONSE
         else:
             return None
 
-    def analyze_scia_values(self, doc):
+    def analyze_scia_values(self, text):
         """
-        Analyzes the input document for keywords related to SCIA values and provides relevant scenarios.
+        Analyzes the input text for keywords related to SCIA values and provides relevant scenarios.
 
         Args:
-            doc (spacy.Doc): The processed spaCy document.
+            text (str): The lowercased input text.
 
         Returns:
             str or None: A scenario description for the detected SCIA value or None if no relevant keywords are found.
         """
-        scia_keywords = ["safety", "customer obsession", "integrity", "accountability"]
-        values_keyword = "values"
-    
-        # Check if "values" is present in the document
-        if values_keyword in doc.text.lower():
-            scia_values = [keyword.capitalize() for keyword in scia_keywords]
-            return ", ".join(scia_values)
-
-        for keyword in scia_keywords:
-            if keyword in doc.text.lower():
-                value = keyword.capitalize()
-                meaning = self.get_scenario_for_value(keyword)
-                return f"{value}: {meaning}"
+        keyword = None
+        for match in _SCIA_RE.finditer(text):
+            # "values" anywhere in the text lists all of them
+            if match.group(1) == "values":
+                return _SCIA_VALUES
+            # Several values mentioned, answer the one listed first in _SCIA_KEYWORDS
+            if keyword is None or _SCIA_KEYWORDS.index(match.group(1)) < _SCIA_KEYWORDS.index(keyword):
+                keyword = match.group(1)
+
+        if keyword:
+            value = keyword.capitalize()
+            meaning = self.get_scenario_for_value(keyword)
+            return f"{value}: {meaning}"
         return None
 
     def get_scenario_for_value(self, value):
@@ -136,16 +351,10 @@ class NLPManager:
         Returns:
             str: A scenario description or a default message if the value is not recognized.
         """
-        scenarios = {
-            "safety":" Safety is the foundation of everything we do.",
-            "customer obsession":" We commit to creating positive memorable experiences for our customers.",
-            "integrity":" We shall be ethical and trustworthy in all our engagements and we shall treat each person with respect.",
-            "accountability":" We take initiative and responsibility for our actions, decisions and results."
-        }
         default_message = "I don't have an answer for that, sorry."
 
         # Get the scenario for the given value
-        scenario = scenarios.get(value.lower(), default_message)
+        scenario = _SCIA_SCENARIOS.get(value.lower(), default_message)
 
         return scenario if scenario else default_message
         
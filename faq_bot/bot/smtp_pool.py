@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+""" Module that keeps persistent SMTP connections for the bot's emails """
+import smtplib
+import threading
+
+# Seconds before a blocking SMTP call gives up, so a half-open connection can't
+# hang a send (and every send queued behind its lock) forever
+SMTP_TIMEOUT = 30
+
+
+class _PooledConnection:
+    """
+    An authenticated SMTP connection for one (server, port, sender) and its bookkeeping.
+    The lock must be held while using or replacing the connection.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.server = None
+        self.sender_password = None
+        self.sent = 0
+
+    def open(self, smtp_server, smtp_port, sender_email, sender_password, timeout=SMTP_TIMEOUT):
+        """ Open a new connection, start TLS and log in. """
+        server = smtplib.SMTP(smtp_server, smtp_port, timeout=timeout)
+        try:
+            # Start TLS for security
+            server.starttls()
+
+            # Log in to the email server
+            server.login(sender_email, sender_password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.sender_password = sender_password
+        self.sent = 0
+
+    def close(self):
+        """ Close the connection, if any. """
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                self.server.close()
+        self.server = None
+        self.sender_password = None
+        self.sent = 0
+
+
+class SMTPPool:
+    """
+    Persistent SMTP connections shared by every forwarded query.
+
+    Opening a connection costs a TCP connect, a TLS handshake and an AUTH
+    roundtrip, which dominates the time taken to send a short email. The pool
+    keeps one authenticated connection per (server, port, sender), opened
+    lazily and reused for subsequent emails. A background heartbeat sends NOOP
+    on idle connections so the server doesn't drop them, and closes the ones
+    that fail so the next email reconnects and logs in again.
+
+    Attributes:
+    - max_messages_per_connection (int): Emails sent before a connection is rotated.
+    - heartbeat_interval (float): Seconds between NOOP health checks.
+    - timeout (float): Seconds before a blocking SMTP call on a connection gives up.
+    """
+
+    def __init__(self, max_messages_per_connection=500, heartbeat_interval=60, timeout=SMTP_TIMEOUT):
+        """
+        Initialize the SMTPPool without opening any connection.
+
+        Parameters:
+        - max_messages_per_connection (int): Emails sent before a connection is rotated,
+          so long-lived connections stay within the server's per-session limits.
+        - heartbeat_interval (float): Seconds between NOOP health checks.
+        - timeout (float): Seconds before a blocking SMTP call on a connection gives up.
+        """
+        self.max_messages_per_connection = max_messages_per_connection
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._heartbeat = None
+        self._stopped = threading.Event()
+        self._closed = False
+
+    def _get_connection(self, key):
+        """
+        Get the pooled connection for a (server, port, sender) key, creating an empty one if needed.
+
+        Returns:
+        - _PooledConnection: The pooled connection, possibly not yet opened.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SMTP pool is closed")
+            connection = self._connections.get(key)
+            if connection is None:
+                connection = self._connections[key] = _PooledConnection()
+            # Started on first use rather than at import, so preforked workers each run their own
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._stopped.clear()
+                self._heartbeat = threading.Thread(target=self._run_heartbeat, name="smtp-heartbeat", daemon=True)
+                self._heartbeat.start()
+            return connection
+
+    def sendmail(self, smtp_server, smtp_port, sender_email, sender_password, to_addrs, msg):
+        """
+        Send an email over the pooled connection, reconnecting once if the server dropped it.
+        Raises RuntimeError once the pool has been closed.
+
+        Parameters:
+        - smtp_server (str): SMTP server address.
+        - smtp_port (int): SMTP server port.
+        - sender_email (str): Bot's email address.
+        - sender_password (str): Bot's email password.
+        - to_addrs (list): Recipient email addresses.
+        - msg (str or bytes): The full message, headers included.
+        """
+        connection = self._get_connection((smtp_server, smtp_port, sender_email))
+        with connection.lock:
+            # close() may have run since the connection was handed out, don't reopen an orphan
+            if self._closed:
+                connection.close()
+                raise RuntimeError("SMTP pool is closed")
+            if (connection.sender_password != sender_password
+                    or connection.sent >= self.max_messages_per_connection):
+                connection.close()
+
+            for attempt in range(2):
+                if connection.server is None:
+                    connection.open(smtp_server, smtp_port, sender_email, sender_password, self.timeout)
+                try:
+                    connection.server.sendmail(sender_email, to_addrs, msg)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # The server rejected this email but the session is still in sync
+                    # (smtplib resets it), keep the connection for the next one
+                    raise
+                except smtplib.SMTPServerDisconnected:
+                    # The server closed the connection, open a fresh one and retry
+                    connection.close()
+                    if attempt:
+                        raise
+                except OSError:
+                    # Timed out or broken mid-conversation, the connection can't be reused
+                    connection.close()
+                    raise
+                else:
+                    connection.sent += 1
+                    return
+
+    def check_connections(self):
+        """
+        Send NOOP on every idle pooled connection and close the ones that fail.
+        Connections busy sending are skipped, they are evidently alive. The NOOP
+        holds the connection's lock, so it is bounded by the pool's socket timeout.
+        """
+        with self._lock:
+            connections = list(self._connections.values())
+
+        for connection in connections:
+            if not connection.lock.acquire(blocking=False):
+                continue
+            try:
+                if connection.server is not None:
+                    try:
+                        code, _ = connection.server.noop()
+                    except (smtplib.SMTPException, OSError):
+                        code = None
+                    if code != 250:
+                        connection.close()
+            finally:
+                connection.lock.release()
+
+    def _run_heartbeat(self):
+        """ Run check_connections every heartbeat_interval seconds until the pool is closed. """
+        while not self._stopped.wait(self.heartbeat_interval):
+            self.check_connections()
+
+    def close(self):
+        """ Stop the heartbeat and close every pooled connection. Later sends are refused. """
+        self._stopped.set()
+        with self._lock:
+            self._closed = True
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._heartbeat = None
+
+        for connection in connections:
+            with connection.lock:
+                connection.close()
+
+
+# Shared pool for the bot's outgoing emails
+smtp_pool = SMTPPool()
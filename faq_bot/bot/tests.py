@@ -1,3 +1,267 @@
+import random
+import smtplib
+import threading
+from concurrent.futures import Future
+from unittest import mock
+
+import orjson
 from django.test import TestCase
 
-# Create your tests here.
+from . import bot_manager
+from .bot_manager import Admin, RuleBasedBot, build_query_email
+from .nlp_manager import NLPManager
+from .smtp_pool import SMTPPool
+
+
+class NLPManagerTests(TestCase):
+    def setUp(self):
+        self.nlp_manager = NLPManager()
+
+    def chained(self, text):
+        """ The answer of the individual analyzers, in the order respond() used to call them """
+        return (
+            self.nlp_manager.analyze_greeting(text)
+            or self.nlp_manager.analyze_mission_vision(text)
+            or self.nlp_manager.analyze_scia_values(text)
+        )
+
+    def test_scia_value_listed_first_wins(self):
+        self.assertTrue(self.nlp_manager.analyze("integrity and safety").startswith("Safety:"))
+        self.assertTrue(self.nlp_manager.analyze("Accountability or customer obsession?").startswith("Customer obsession:"))
+
+    def test_values_lists_every_scia_value(self):
+        self.assertEqual(
+            self.nlp_manager.analyze("integrity values"),
+            "Safety, Customer obsession, Integrity, Accountability",
+        )
+
+    def test_greeting_only_beats_thanks_as_first_word(self):
+        self.assertEqual(self.nlp_manager.analyze("hi, thanks"), "Hello there! How can I assist you today?")
+        self.assertEqual(self.nlp_manager.analyze("thanks, hi"), "You're welcome!")
+        self.assertEqual(self.nlp_manager.analyze("ok hi"), "Hello there! How can I assist you today?")
+        self.assertIsNone(self.nlp_manager.analyze("this"))
+
+    def test_router_matches_chained_analyzers(self):
+        words = [
+            "hi", "hello", "hey", "this", "thank you", "thanks", ",", "?", "x", "the",
+            "mission", "vision", "television", "values", "safety", "integrity",
+            "customer obsession", "accountability",
+        ]
+        rng = random.Random(0)
+        for _ in range(5000):
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+            with self.subTest(text=text):
+                self.assertEqual(self.nlp_manager._analyze(text), self.chained(text))
+
+
+@mock.patch.object(bot_manager, "_FORWARD_EXECUTOR")
+class RuleBasedBotTests(TestCase):
+    def setUp(self):
+        self.bot = RuleBasedBot()
+        self.admin = Admin(self.bot)
+
+    def respond(self, user_input):
+        return self.bot.respond(user_input, self.admin, "", 587, "", "", "")
+
+    def test_keys_are_normalized(self, executor):
+        self.admin.provide_answer("Where  is the Office?", "Nairobi")
+        self.assertEqual(self.respond("where is the office?"), "Nairobi")
+        self.assertEqual(list(self.bot.db), ["where is the office?"])
+
+    def test_unknown_query_is_forwarded_once(self, executor):
+        self.assertEqual(self.respond("What is the fee?"), "I don't have an answer for that, sorry.")
+        self.assertEqual(self.respond("what is the fee?"), "Forwarded to admin's email. Waiting for response.")
+        self.assertEqual(executor.submit.call_count, 1)
+
+    def test_full_forward_backlog_marks_error(self, executor):
+        with mock.patch.object(bot_manager, "_FORWARD_SLOTS", threading.BoundedSemaphore(1)):
+            self.respond("What is the fee?")
+            self.assertEqual(self.respond("Where is the office?"), "I don't have an answer for that, sorry.")
+        self.assertEqual(executor.submit.call_count, 1)
+        self.assertEqual(self.admin.get_response("Where is the office?"), bot_manager._FORWARD_ERROR)
+        self.assertNotIn("where is the office?", self.bot.pending)
+
+    def test_prefix_match_needs_several_words(self, executor):
+        self.admin.provide_answer("what", "W")
+        self.admin.provide_answer("what is the baggage allowance", "23kg")
+        self.assertEqual(self.respond("what is the baggage allowance for kids"), "23kg")
+        self.assertEqual(self.respond("what time is it"), "I don't have an answer for that, sorry.")
+
+    def test_analyzers_beat_prefix_matches(self, executor):
+        self.admin.provide_answer("hi", "Admin hi")
+        self.assertEqual(self.respond("hi what is the mission"), "Hello there! How can I assist you today?")
+
+    def test_analyzers_beat_fuzzy_matches(self, executor):
+        self.admin.provide_answer("what is the vision?", "Admin vision")
+        self.admin.provide_answer("is it safe?", "Admin safe")
+        self.assertTrue(self.respond("what is the mission?").startswith("To propel Africa's prosperity"))
+        self.assertTrue(self.respond("is it safety?").startswith("Safety:"))
+
+    def test_fuzzy_match_answers_typos(self, executor):
+        self.admin.provide_answer("what is the baggage allowance", "23kg")
+        self.assertEqual(self.respond("what is the bagage allowance"), "23kg")
+        self.assertEqual(self.respond("what is baggage allowance"), "I don't have an answer for that, sorry.")
+
+    def test_pending_queries_are_evicted_but_answers_are_kept(self, executor):
+        self.admin.provide_answer("How do I book a flight?", "Online")
+        with mock.patch.object(bot_manager, "PENDING_MAX_ENTRIES", 3):
+            for i in range(5):
+                self.respond(f"junk question {i}")
+        self.assertEqual(list(self.bot.pending), ["junk question 2", "junk question 3", "junk question 4"])
+        self.assertEqual(self.respond("how do i book a flight?"), "Online")
+
+    def test_unique_misses_stay_bounded(self, executor):
+        def run_inline(fn, *args):
+            # Run forwards inline so the admin's bookkeeping fills up too
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+        executor.submit.side_effect = run_inline
+        with mock.patch.object(bot_manager, "PENDING_MAX_ENTRIES", 3), \
+                mock.patch.object(bot_manager, "smtp_pool") as pool:
+            for i in range(5):
+                self.respond(f"Junk question {i}")
+        self.assertEqual(pool.sendmail.call_count, 5)
+        self.assertEqual(list(self.bot.pending), ["junk question 2", "junk question 3", "junk question 4"])
+        self.assertEqual(self.admin.get_unanswered_queries(), ["junk question 2", "junk question 3", "junk question 4"])
+
+    def test_pending_lookup_refreshes_lru_order(self, executor):
+        with mock.patch.object(bot_manager, "PENDING_MAX_ENTRIES", 2):
+            self.respond("junk question 0")
+            self.respond("junk question 1")
+            self.respond("junk question 0")
+            self.respond("junk question 2")
+        self.assertEqual(list(self.bot.pending), ["junk question 0", "junk question 2"])
+
+    def test_answering_a_pending_query_replaces_it(self, executor):
+        self.respond("What is the fee?")
+        self.admin.provide_answer("What is the fee?", "Free")
+        self.assertNotIn("what is the fee?", self.bot.pending)
+        self.assertEqual(self.respond("what is the fee?"), "Free")
+
+
+class BuildQueryEmailTests(TestCase):
+    def test_ascii_query_uses_template(self):
+        msg = build_query_email("what is\nthe fee?", "bot@example.com", "admin@example.com")
+        self.assertIsInstance(msg, bytes)
+        self.assertIn(b"Subject: New Query: what is the fee?\r\n", msg)
+        self.assertIn(b"\r\n\r\nwhat is\r\nthe fee?\r\n", msg)
+
+    def test_long_lines_fall_back_to_mime(self):
+        msg = build_query_email("a" + " " * 2000 + "b", "bot@example.com", "admin@example.com")
+        self.assertLessEqual(max(len(line) for line in msg.splitlines()), 998)
+
+    def test_long_word_subject_is_truncated(self):
+        msg = build_query_email("a" * 3000, "bot@example.com", "admin@example.com")
+        self.assertIn(" " + "a" * 877 + "...\n", msg)
+        self.assertLessEqual(max(len(line) for line in msg.splitlines()), 998)
+
+    def test_long_non_ascii_subject_is_folded(self):
+        msg = build_query_email("é" * 3000, "bot@example.com", "admin@example.com")
+        self.assertLessEqual(max(len(line) for line in msg.splitlines()), 998)
+
+    def test_non_ascii_query_falls_back_to_mime(self):
+        msg = build_query_email("café?", "bot@example.com", "admin@example.com")
+        self.assertIsInstance(msg, str)
+        self.assertTrue(msg.isascii())
+
+
+@mock.patch("smtplib.SMTP")
+class SMTPPoolTests(TestCase):
+    def setUp(self):
+        # Long heartbeat interval, the tests run check_connections themselves
+        self.pool = SMTPPool(max_messages_per_connection=2, heartbeat_interval=3600)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def send(self, server="smtp.example.com"):
+        self.pool.sendmail(server, 587, "bot@example.com", "secret", ["admin@example.com"], "msg")
+
+    def test_connection_is_reused_and_rotated(self, smtp):
+        for _ in range(3):
+            self.send()
+        self.assertEqual(smtp.call_count, 2)
+        self.assertEqual(smtp.return_value.login.call_count, 2)
+        smtp.assert_called_with("smtp.example.com", 587, timeout=self.pool.timeout)
+
+    def test_connections_are_kept_per_server(self, smtp):
+        self.send("smtp.example.com")
+        self.send("smtp.example.org")
+        self.send("smtp.example.com")
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_reconnects_when_server_disconnected(self, smtp):
+        self.send()
+        smtp.return_value.sendmail.side_effect = [smtplib.SMTPServerDisconnected(), None]
+        self.send()
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_rejected_email_keeps_connection(self, smtp):
+        smtp.return_value.sendmail.side_effect = [
+            smtplib.SMTPRecipientsRefused({}),
+            smtplib.SMTPDataError(554, b"Rejected"),
+            None,
+        ]
+        for error in (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError):
+            with self.assertRaises(error):
+                self.send()
+        self.send()
+        self.assertEqual(smtp.call_count, 1)
+
+    def test_socket_error_closes_connection(self, smtp):
+        smtp.return_value.sendmail.side_effect = [TimeoutError(), None]
+        with self.assertRaises(TimeoutError):
+            self.send()
+        self.send()
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_heartbeat_closes_failed_connections(self, smtp):
+        self.send()
+        smtp.return_value.noop.return_value = (250, b"OK")
+        self.pool.check_connections()
+        self.send()
+        self.assertEqual(smtp.call_count, 1)
+
+        smtp.return_value.noop.side_effect = smtplib.SMTPServerDisconnected()
+        self.pool.check_connections()
+        self.send()
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_closed_pool_refuses_sends(self, smtp):
+        self.send()
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            self.send()
+        self.assertEqual(smtp.call_count, 1)
+
+
+@mock.patch.object(bot_manager, "_FORWARD_EXECUTOR")
+class BotViewTests(TestCase):
+    def post(self, data):
+        return self.client.post("/bot/", orjson.dumps(data), content_type="application/json")
+
+    def test_single_input(self, executor):
+        response = self.post({"user_input": "hello"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(orjson.loads(response.content), {"bot_response": "Hello there! How can I assist you today?"})
+
+    def test_batch_inputs(self, executor):
+        response = self.post({"user_inputs": ["hello", "thanks"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            orjson.loads(response.content),
+            {"bot_responses": ["Hello there! How can I assist you today?", "You're welcome!"]},
+        )
+
+    def test_batch_must_be_list_of_strings(self, executor):
+        self.assertEqual(self.post({"user_inputs": "hello"}).status_code, 400)
+        self.assertEqual(self.post({"user_inputs": ["hello", 1]}).status_code, 400)
+
+    def test_batch_size_is_capped(self, executor):
+        from .views import MAX_BATCH_INPUTS
+
+        response = self.post({"user_inputs": [f"junk question {i}" for i in range(MAX_BATCH_INPUTS + 1)]})
+        self.assertEqual(response.status_code, 400)
+        executor.submit.assert_not_called()
@@ -1,6 +1,6 @@
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-import json
+import orjson
 from .bot_manager import RuleBasedBot, Admin
 from .smtp_config import SMTPConfig
 
@@ -16,27 +16,53 @@ smtp_config_instance = SMTPConfig(
     recipient_email=''
 )
 
+
+# Most inputs accepted in one 'user_inputs' batch, each unknown one queues an admin email
+MAX_BATCH_INPUTS = 20
+
+
+def json_response(data, status=200):
+    """ Serializes data with orjson, which is much faster than the stdlib json used by JsonResponse """
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
+
+
+def get_bot_response(user_input):
+    """ Answers one user input with the shared bot, admin and SMTP configuration """
+    return bot_instance.respond(
+        user_input,
+        admin_instance,
+        smtp_config_instance.smtp_server,
+        smtp_config_instance.smtp_port,
+        smtp_config_instance.sender_email,
+        smtp_config_instance.sender_password,
+        smtp_config_instance.recipient_email
+    )
+
+
 @csrf_exempt
 def bot_view(request):
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            data = orjson.loads(request.body)
+
+            # Several inputs can be sent at once as a list under 'user_inputs'
+            user_inputs = data.get('user_inputs')
+            if user_inputs is not None:
+                if not isinstance(user_inputs, list) or not all(isinstance(user_input, str) for user_input in user_inputs):
+                    return json_response({'error': 'user_inputs must be a list of strings'}, status=400)
+                if len(user_inputs) > MAX_BATCH_INPUTS:
+                    return json_response({'error': f'At most {MAX_BATCH_INPUTS} user_inputs are allowed per request'}, status=400)
+                bot_responses = [get_bot_response(user_input) for user_input in user_inputs]
+                return json_response({'bot_responses': bot_responses})
+
             user_input = data.get('user_input')
             if user_input is None:
-                return JsonResponse({'error': 'User input is required'}, status=400)
+                return json_response({'error': 'User input is required'}, status=400)
 
-            bot_response = bot_instance.respond(
-                user_input,
-                admin_instance,
-                smtp_config_instance.smtp_server,
-                smtp_config_instance.smtp_port,
-                smtp_config_instance.sender_email,
-                smtp_config_instance.sender_password,
-                smtp_config_instance.recipient_email
-            )
+            bot_response = get_bot_response(user_input)
 
-            return JsonResponse({'bot_response': bot_response})
+            return json_response({'bot_response': bot_response})
 
         except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
-    return JsonResponse({'error': 'Only POST requests are allowed.'}, status=400)
+            return json_response({'error': str(e)}, status=500)
+    return json_response({'error': 'Only POST requests are allowed.'}, status=400)
@@ -0,0 +1,15 @@
+""" Gunicorn configuration for the FAQ bot, picked up automatically from this directory """
+
+# Import the Django app once in the master process, so forked workers share its
+# pages copy-on-write and restarted workers come up without re-importing it.
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Builds the bot instances in the master before any worker is forked.
+    Django resolves the URLconf lazily, so preloading the WSGI app alone
+    wouldn't import bot.views. Nothing in it starts threads or opens
+    connections at import time, so it is safe to fork.
+    """
+    import bot.views  # noqa: F401